@@ -1,6 +1,7 @@
 import os
 
 from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+from fastapi import FastAPI
 from opentelemetry import trace
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
@@ -8,10 +9,9 @@ from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
-from starlette.types import ASGIApp
 
 
-def inject_instrumentation(app: ASGIApp) -> None:
+def inject_instrumentation(app: FastAPI) -> None:
     # For Manual Instrumentation guide
     # https://opentelemetry.io/docs/instrumentation/python/manual/
 
@@ -27,15 +27,38 @@ def inject_instrumentation(app: ASGIApp) -> None:
     # https://opentelemetry.io/docs/reference/specification/trace/api/#tracerprovider
     # For Sampling
     # https://opentelemetry-python.readthedocs.io/en/latest/sdk/trace.sampling.html
-    tracer = TracerProvider(resource=resource, sampler=ParentBasedTraceIdRatio(1))
+    # OTEL_TRACES_SAMPLER_ARG sets the ratio of root traces that get sampled
+    sampling_ratio = float(os.environ.get("OTEL_TRACES_SAMPLER_ARG", "0.05"))
+    tracer = TracerProvider(
+        resource=resource, sampler=ParentBasedTraceIdRatio(sampling_ratio)
+    )
 
     trace.set_tracer_provider(tracer)
 
     exporter = AzureMonitorTraceExporter(
         connection_string=os.environ.get("APPINSIGHT_CONNECTION_STRING"),
     )
-    span_processor = BatchSpanProcessor(exporter)
+    # Sized for bursty traffic, every value can be overridden with the
+    # standard OTEL_BSP_* environment variables
+    span_processor = BatchSpanProcessor(
+        exporter,
+        max_queue_size=int(os.environ.get("OTEL_BSP_MAX_QUEUE_SIZE", "8192")),
+        max_export_batch_size=int(
+            os.environ.get("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "1024")
+        ),
+        schedule_delay_millis=int(os.environ.get("OTEL_BSP_SCHEDULE_DELAY", "2000")),
+        export_timeout_millis=int(os.environ.get("OTEL_BSP_EXPORT_TIMEOUT", "10000")),
+    )
     trace.get_tracer_provider().add_span_processor(span_processor)
+    # Export whatever is still queued before the process exits
+    app.add_event_handler("shutdown", tracer.force_flush)
 
     LoggingInstrumentor().instrument(set_logging_format=True)
-    FastAPIInstrumentor.instrument_app(app, tracer_provider=tracer)
+    # Health checks, scrapes and API docs are not worth a trace
+    excluded_urls = os.environ.get(
+        "OTEL_PYTHON_FASTAPI_EXCLUDED_URLS",
+        "/healthz,/metrics,/docs,/openapi.json,/redoc",
+    )
+    FastAPIInstrumentor.instrument_app(
+        app, tracer_provider=tracer, excluded_urls=excluded_urls
+    )
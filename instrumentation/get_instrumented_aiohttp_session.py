@@ -1,9 +1,19 @@
 import aiohttp
 from opentelemetry.instrumentation.aiohttp_client import create_trace_config
-from functools import lru_cache
 
-@lru_cache
+
 def get_instrumented_aiohttp_session() -> aiohttp.ClientSession:
+    # Must be called from within the running event loop (app startup), the
+    # returned session is meant to be shared and closed on app shutdown
+    connector = aiohttp.TCPConnector(
+        limit=200,
+        limit_per_host=50,
+        ttl_dns_cache=300,
+        keepalive_timeout=75,
+        enable_cleanup_closed=True,
+    )
     return aiohttp.ClientSession(
-        trace_configs=[create_trace_config()]
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=30),
+        trace_configs=[create_trace_config()],
     )
@@ -1,19 +1,104 @@
 import logging
 from logging import LogRecord
+from logging.handlers import MemoryHandler
+from typing import Optional
 from opentelemetry import trace
-from opentelemetry.trace import INVALID_SPAN, StatusCode
+from opentelemetry.trace import INVALID_SPAN, Span, StatusCode
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Bound once, emit runs for every buffered record
+_get_current_span = trace.get_current_span
+_INVALID = INVALID_SPAN
+_ERROR = StatusCode.ERROR
 
 
 class InstrumentedLoggerHandler(logging.Handler):
+    def __init__(self, level=logging.WARNING) -> None:
+        super().__init__(level)
+
     def emit(self, record: LogRecord) -> None:
-        span = trace.get_current_span()
-        if span != INVALID_SPAN:
-            span.add_event(f"{record.levelname}: {record.msg}")
-            if record.levelno >= 40:
-                span.set_status(StatusCode.ERROR)
+        # MemoryHandler.flush calls target.handle directly, which skips the
+        # level check done by Logger.callHandlers
+        if record.levelno < self.level:
+            return
+        span = getattr(record, "otel_span", None)
+        if span is None:
+            span = _get_current_span()
+        if span is _INVALID or not span.is_recording():
+            return
+        # Events are added when the buffer is flushed, keep the log time
+        span.add_event(
+            f"{record.levelname}: {self.format(record)}",
+            timestamp=int(record.created * 1e9),
+        )
+        if record.levelno >= logging.ERROR:
+            span.set_status(_ERROR)
+
+
+class BufferedInstrumentedLoggerHandler(MemoryHandler):
+    def __init__(self, capacity: int = 100) -> None:
+        target = InstrumentedLoggerHandler()
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target)
+        self.setLevel(target.level)
+
+    def emit(self, record: LogRecord) -> None:
+        # Remember the span active at log time, the buffer may be flushed
+        # from another request's context. Records for spans that are not
+        # recording would be dropped on flush, so they are never buffered
+        span = _get_current_span()
+        if span is _INVALID or not span.is_recording():
+            return
+        record.otel_span = span
+        super().emit(record)
+
+    def flush_span(self, span: Span) -> None:
+        # Emit only the records logged under span, it must still be open
+        self.acquire()
+        try:
+            records = [r for r in self.buffer if r.otel_span is span]
+            if records:
+                self.buffer = [r for r in self.buffer if r.otel_span is not span]
+                for record in records:
+                    self.target.handle(record)
+        finally:
+            self.release()
+
+
+# Shared by every instrumented logger. Kept off the root logger, otherwise the
+# logging.basicConfig call made by LoggingInstrumentor becomes a no-op
+_handler = BufferedInstrumentedLoggerHandler()
+
+
+def flush_span_events(span: Optional[Span] = None) -> None:
+    # Events added to an ended span are dropped, so with_instrumentation
+    # flushes its span's records before ending it and the middleware flushes
+    # the rest while the request span is still open
+    if not _handler.buffer:
+        return
+    if span is None:
+        _handler.flush()
+    else:
+        _handler.flush_span(span)
+
+
+class FlushSpanEventsMiddleware:
+    # Plain ASGI middleware, must sit inside the OpenTelemetry middleware so
+    # the request span is still open when the buffer is flushed
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            flush_span_events()
 
 
 def get_instumented_logger(*args, **kwargs) -> logging.Logger:
     logger = logging.getLogger(*args, **kwargs)
-    logger.addHandler(InstrumentedLoggerHandler())
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
     return logger
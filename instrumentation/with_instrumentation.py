@@ -1,32 +1,143 @@
 import inspect
-from functools import wraps
+import os
+from functools import lru_cache, wraps
 from typing import Callable
 
 from opentelemetry import trace
+from opentelemetry.trace import NoOpTracerProvider, ProxyTracerProvider, Span
+from sqlalchemy.orm import DeclarativeMeta, Session
+
+from instrumentation.get_instrumented_logger import flush_span_events
+
+# Resolved once at import, before inject_instrumentation sets the provider this
+# is a ProxyTracer that delegates to the real tracer as soon as it is set
+_TRACER = trace.get_tracer(__name__)
+
+# Unknown until the first decorated call, by then inject_instrumentation has
+# either set a real provider or the app is running without telemetry
+_tracing_enabled = None
+
+
+def _is_tracing_enabled() -> bool:
+    global _tracing_enabled
+    if _tracing_enabled is None:
+        _tracing_enabled = not isinstance(
+            trace.get_tracer_provider(), (ProxyTracerProvider, NoOpTracerProvider)
+        )
+    return _tracing_enabled
+
+
+# Attribute values are stringified reprs which can get arbitrarily large
+_MAX_VALUE_LENGTH = int(os.environ.get("OTEL_ATTRIBUTE_VALUE_LENGTH_LIMIT", "256"))
+
+# Scalars are valid attribute values as-is, sessions and ORM models are only
+# recorded by class name since their repr may hit the database
+_SCALAR_TYPES = (bool, int, float)
+
+
+def _is_opaque(value) -> bool:
+    return isinstance(value, Session) or isinstance(type(value), DeclarativeMeta)
+
+
+def _attribute_value(value):
+    if isinstance(value, _SCALAR_TYPES):
+        return value
+    if isinstance(value, str):
+        return value[:_MAX_VALUE_LENGTH]
+    if _is_opaque(value):
+        return type(value).__name__
+    if isinstance(value, (list, tuple)) and any(_is_opaque(v) for v in value):
+        names = ", ".join(sorted({type(v).__name__ for v in value}))
+        return f"{type(value).__name__}[{len(value)}] of {names}"
+    return str(value)[:_MAX_VALUE_LENGTH]
+
+
+# Attribute keys are built once instead of formatted on every call
+_ARG_KEYS = [(f"operation.arg_{i}_value", f"operation.args_{i}_type") for i in range(16)]
+
+
+def _arg_keys(idx: int) -> tuple:
+    if idx < len(_ARG_KEYS):
+        return _ARG_KEYS[idx]
+    return f"operation.arg_{idx}_value", f"operation.args_{idx}_type"
+
+
+@lru_cache(maxsize=128)
+def _kwarg_keys(name: str) -> tuple:
+    return f"operation.kwarg_{name}_value", f"operation.kwarg_{name}_type"
+
+
+def _set_call_attributes(span: Span, name: str, args: tuple, kwargs: dict) -> None:
+    attrs = {"operation.module": name}
+    for idx, a in enumerate(args):
+        value_key, type_key = _arg_keys(idx)
+        attrs[value_key] = _attribute_value(a)
+        attrs[type_key] = str(type(a))
+    for k, v in kwargs.items():
+        value_key, type_key = _kwarg_keys(k)
+        attrs[value_key] = _attribute_value(v)
+        attrs[type_key] = str(type(v))
+    span.set_attributes(attrs)
+
+
+def _set_result_attributes(span: Span, result) -> None:
+    span.set_attributes(
+        {
+            "operation.result_value": _attribute_value(result),
+            "operation.result_type": str(type(result)),
+        }
+    )
 
 
 def with_instrumentation(fn: Callable):
+    # The global provider can only be set once, an explicit no-op stays no-op
+    if isinstance(trace.get_tracer_provider(), NoOpTracerProvider):
+        return fn
+
+    _name = f"{fn.__module__}.{fn.__name__}"
+
+    # Decide once whether fn is a coroutine function so sync functions get a
+    # plain wrapper and never pay for an extra coroutine per call
+    if inspect.iscoroutinefunction(fn):
+
+        @wraps(fn)
+        async def __otel_async_wrap(*args, **kwargs):
+            if not _is_tracing_enabled():
+                return await fn(*args, **kwargs)
+            with _TRACER.start_as_current_span(_name) as span:
+                if not span.is_recording():
+                    return await fn(*args, **kwargs)
+                _set_call_attributes(span, _name, args, kwargs)
+                try:
+                    result = await fn(*args, **kwargs)
+                    _set_result_attributes(span, result)
+                    return result
+                except Exception as e:
+                    span.set_status(trace.StatusCode.ERROR)
+                    span.record_exception(e)
+                    raise e
+                finally:
+                    flush_span_events(span)
+
+        return __otel_async_wrap
+
     @wraps(fn)
-    async def __otel_wrap(*args, **kwargs):
-        tracer = trace.get_tracer(__name__)
-        with tracer.start_as_current_span(f"{fn.__module__}.{fn.__name__}") as span:
-            span.set_attribute("operation.module", f"{fn.__module__}.{fn.__name__}")
-            for idx, a in enumerate(args):
-                span.set_attribute(f"operation.arg_{idx}_value", str(a))
-                span.set_attribute(f"operation.args_{idx}_type", str(type(a)))
-            for k, v in kwargs.items():
-                span.set_attribute(f"operation.kwarg_{k}_value", str(v))
-                span.set_attribute(f"operation.kwarg_{k}_type", str(type(v)))
+    def __otel_wrap(*args, **kwargs):
+        if not _is_tracing_enabled():
+            return fn(*args, **kwargs)
+        with _TRACER.start_as_current_span(_name) as span:
+            if not span.is_recording():
+                return fn(*args, **kwargs)
+            _set_call_attributes(span, _name, args, kwargs)
             try:
                 result = fn(*args, **kwargs)
-                if inspect.iscoroutine(result):
-                    result = await result
-                span.set_attribute("operation.result_value", str(result))
-                span.set_attribute("operation.result_type", str(type(result)))
+                _set_result_attributes(span, result)
                 return result
             except Exception as e:
                 span.set_status(trace.StatusCode.ERROR)
                 span.record_exception(e)
                 raise e
+            finally:
+                flush_span_events(span)
 
     return __otel_wrap
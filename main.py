@@ -1,20 +1,23 @@
-import asyncio
 import os
 from typing import List, Optional
 
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 import sql_app.models as models
 import sql_app.schemas as schemas
 import universities
 from db import engine, get_db
-from instrumentation.az_inject_instrumentation import inject_instrumentation
-from instrumentation.get_instrumented_logger import get_instumented_logger
+from instrumentation.get_instrumented_aiohttp_session import (
+    get_instrumented_aiohttp_session,
+)
+from instrumentation.get_instrumented_logger import (
+    FlushSpanEventsMiddleware,
+    get_instumented_logger,
+)
 from instrumentation.with_instrumentation import with_instrumentation
 from sql_app.repositories import ItemRepo, StoreRepo
 
@@ -22,16 +25,31 @@ app = FastAPI(
     title="Sample FastAPI Application",
     description="Sample FastAPI Application with Swagger and Sqlalchemy",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
+# Added before inject_instrumentation so FastAPIInstrumentor wraps around it
+app.add_middleware(FlushSpanEventsMiddleware)
 
 models.Base.metadata.create_all(bind=engine)
 logger = get_instumented_logger(__name__)
 
+UNIVERSITY_COUNTRIES = ["turkey", "india", "australia"]
+
+
+@app.on_event("startup")
+async def open_http_session():
+    app.state.http = get_instrumented_aiohttp_session()
+
+
+@app.on_event("shutdown")
+async def close_http_session():
+    await app.state.http.close()
+
 
 @app.exception_handler(Exception)
 def validation_exception_handler(request, err):
     base_error_message = f"Failed to execute: {request.method}: {request.url}"
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400, content={"message": f"{base_error_message}. Detail: {err}"}
     )
 
@@ -57,10 +75,8 @@ def get_all_items(name: Optional[str] = None, db: Session = Depends(get_db)):
     Get all the Items stored in database
     """
     if name:
-        items = []
         db_item = ItemRepo.fetch_by_name(db, name)
-        items.append(db_item)
-        return items
+        return [db_item] if db_item else []
     else:
         return ItemRepo.fetch_all(db)
 
@@ -83,10 +99,8 @@ async def delete_item(item_id: int, db: Session = Depends(get_db)):
     """
     Delete the Item with the given ID provided by User stored in database
     """
-    db_item = ItemRepo.fetch_by_id(db, item_id)
-    if db_item is None:
+    if not await ItemRepo.delete_by_id(db, item_id):
         raise HTTPException(status_code=404, detail="Item not found with the given ID")
-    await ItemRepo.delete(db, item_id)
     return "Item deleted successfully!"
 
 
@@ -98,14 +112,9 @@ async def update_item(
     """
     Update an Item stored in the database
     """
-    db_item = ItemRepo.fetch_by_id(db, item_id)
-    if db_item:
-        update_item_encoded = jsonable_encoder(item_request)
-        db_item.name = update_item_encoded["name"]
-        db_item.price = update_item_encoded["price"]
-        db_item.description = update_item_encoded["description"]
-        db_item.store_id = update_item_encoded["store_id"]
-        return await ItemRepo.update(db=db, item_data=db_item)
+    item_data = item_request.dict(exclude={"id"})
+    if await ItemRepo.update_by_id(db=db, item_id=item_id, item_data=item_data):
+        return schemas.Item(id=item_id, **item_data)
     else:
         raise HTTPException(status_code=400, detail="Item not found with the given ID")
 
@@ -119,7 +128,6 @@ async def create_store(
     Create a Store and save it in the database
     """
     db_store = StoreRepo.fetch_by_name(db, name=store_request.name)
-    print(db_store)
     if db_store:
         raise HTTPException(status_code=400, detail="Store already exists!")
 
@@ -133,11 +141,8 @@ def get_all_stores(name: Optional[str] = None, db: Session = Depends(get_db)):
     Get all the Stores stored in database
     """
     if name:
-        stores = []
         db_store = StoreRepo.fetch_by_name(db, name)
-        print(db_store)
-        stores.append(db_store)
-        return stores
+        return [db_store] if db_store else []
     else:
         return StoreRepo.fetch_all(db)
 
@@ -160,43 +165,38 @@ async def delete_store(store_id: int, db: Session = Depends(get_db)):
     """
     Delete the Item with the given ID provided by User stored in database
     """
-    db_store = StoreRepo.fetch_by_id(db, store_id)
-    if db_store is None:
+    if not await StoreRepo.delete_by_id(db, store_id):
         raise HTTPException(status_code=404, detail="Store not found with the given ID")
-    await StoreRepo.delete(db, store_id)
     return "Store deleted successfully!"
 
 
 @app.get("/universities/", tags=["University"])
 @with_instrumentation
-def get_universities() -> dict:
+async def get_universities() -> dict:
     """
-    Return the List of universities for some random countries in sync way
+    Return the List of universities for some random countries
     """
-    data: dict = {}
-    data.update(universities.get_all_universities_for_country("turkey"))
-    data.update(universities.get_all_universities_for_country("india"))
-    data.update(universities.get_all_universities_for_country("australia"))
-    return data
+    return await universities.get_all_universities_for_countries_async(
+        app.state.http, UNIVERSITY_COUNTRIES
+    )
 
 
 @app.get("/universities/async", tags=["University"])
 @with_instrumentation
 async def get_universities_async() -> dict:
     """
-    Return the List of universities for some random countries in async way
+    Return the List of universities for some random countries, same as /universities/
     """
-    data: dict = {}
-    await asyncio.gather(
-        universities.get_all_universities_for_country_async("turkey", data),
-        universities.get_all_universities_for_country_async("india", data),
-        universities.get_all_universities_for_country_async("australia", data),
+    return await universities.get_all_universities_for_countries_async(
+        app.state.http, UNIVERSITY_COUNTRIES
     )
-    return data
 
 
 
 if __name__ == "__main__":
+    # Imported here so the Azure exporter and SDK only load when serving
+    from instrumentation.az_inject_instrumentation import inject_instrumentation
+
     load_dotenv()
     inject_instrumentation(app)
     log_config = uvicorn.config.LOGGING_CONFIG
@@ -1,4 +1,5 @@
 
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 
 from . import models, schemas
@@ -22,16 +23,16 @@ class ItemRepo:
  def fetch_all(db: Session, skip: int = 0, limit: int = 100):
      return db.query(models.Item).offset(skip).limit(limit).all()
  
- async def delete(db: Session,item_id):
-     db_item= db.query(models.Item).filter_by(id=item_id).first()
-     db.delete(db_item)
+ async def delete_by_id(db: Session,item_id:int) -> int:
+     result = db.execute(delete(models.Item).where(models.Item.id == item_id))
      db.commit()
+     return result.rowcount
      
      
- async def update(db: Session,item_data):
-    updated_item = db.merge(item_data)
+ async def update_by_id(db: Session,item_id:int,item_data:dict) -> int:
+    result = db.execute(update(models.Item).where(models.Item.id == item_id).values(**item_data))
     db.commit()
-    return updated_item
+    return result.rowcount
     
     
     
@@ -53,10 +54,15 @@ class StoreRepo:
     def fetch_all(db: Session, skip: int = 0, limit: int = 100):
         return db.query(models.Store).offset(skip).limit(limit).all()
     
-    async def delete(db: Session,_id:int):
-        db_store= db.query(models.Store).filter_by(id=_id).first()
-        db.delete(db_store)
-        db.commit()
+    async def delete_by_id(db: Session,_id:int) -> int:
+        # Bulk deletes skip the ORM cascade, so remove the store's items first
+        db.execute(delete(models.Item).where(models.Item.store_id == _id))
+        result = db.execute(delete(models.Store).where(models.Store.id == _id))
+        if result.rowcount:
+            db.commit()
+        else:
+            db.rollback()
+        return result.rowcount
         
     async def update(db: Session,store_data):
         db.merge(store_data)
@@ -1,29 +1,29 @@
-import httpx
+import aiohttp
+import asyncio
 import json
 from sql_app.schemas import University
 
 url = 'http://universities.hipolabs.com/search'
 
 
-def get_all_universities_for_country(country: str) -> dict:
+async def get_all_universities_for_country_async(
+    session: aiohttp.ClientSession, country: str, data: dict
+) -> None:
     params = {'country': country}
-    client = httpx.Client()
-    response = client.get(url, params=params)
-    response_json = json.loads(response.text)
+    async with session.get(url, params=params) as response:
+        response_json = json.loads(await response.text())
     universities = []
     for university in response_json:
         university_obj = University.parse_obj(university)
         universities.append(university_obj)
-    return {country: universities}
+    data[country] = universities
 
 
-async def get_all_universities_for_country_async(country: str, data: dict) -> None:
-    params = {'country': country}
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        response_json = json.loads(response.text)
-        universities = []
-        for university in response_json:
-            university_obj = University.parse_obj(university)
-            universities.append(university_obj)
-    data[country] = universities
+async def get_all_universities_for_countries_async(
+    session: aiohttp.ClientSession, countries: list
+) -> dict:
+    data: dict = {}
+    await asyncio.gather(
+        *(get_all_universities_for_country_async(session, c, data) for c in countries)
+    )
+    return data